@@ -3,23 +3,117 @@
 Reddit User Persona Generator - Flask Web Application
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_from_directory
+from werkzeug.exceptions import NotFound
+from flask.json.provider import JSONProvider
 import sys
 import os
-import json
+import re
 import time
+import hashlib
+import threading
+import orjson
+from collections import OrderedDict
 from datetime import datetime
 from reddit_scraper import RedditScraper
 from persona_generator import PersonaGenerator
+from config import PERSONA_CACHE_SIZE, OUTPUT_DIR, CACHE_TTL
 import logging
 
+class OrjsonProvider(JSONProvider):
+    """Serialize Flask JSON requests and responses with orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
-app.config['JSON_AS_ASCII'] = False
+app.json = OrjsonProvider(app)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Create the output directory once rather than probing for it per request
+try:
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+except OSError as e:
+    logger.warning("Could not create output directory %s: %s", OUTPUT_DIR, e)
+
+# Reddit username rule, shared by profile URL and download validation
+USERNAME_PATTERN = r'[A-Za-z0-9_-]{3,20}'
+USERNAME_RE = re.compile(USERNAME_PATTERN)
+
+# Validates a profile URL and captures the username in one match
+USER_URL_RE = re.compile(rf'^https://www\.reddit\.com/user/({USERNAME_PATTERN})/?$')
+
+# PersonaGenerator is stateless after init, so one instance serves every request
+PERSONA_GENERATOR = PersonaGenerator()
+
+# Shared scraper so requests reuse its pooled connections to Reddit
+SCRAPER = RedditScraper()
+
+# LRU cache of generated personas keyed by (username, digest of scraped data); entries
+# expire after CACHE_TTL since the text embeds the generation time and account age
+_persona_cache = OrderedDict()
+_persona_cache_lock = threading.Lock()
+
+def get_persona(user_data):
+    """Generate a persona, reusing a recent cached one when the scraped data is unchanged"""
+    payload = orjson.dumps(
+        [user_data['posts'], user_data['comments'], user_data.get('user_info', {})],
+        option=orjson.OPT_SORT_KEYS
+    )
+    key = (user_data['username'], hashlib.sha1(payload).hexdigest())
+    
+    now = time.monotonic()
+    
+    with _persona_cache_lock:
+        cached = _persona_cache.get(key)
+        if cached and now - cached[0] <= CACHE_TTL:
+            _persona_cache.move_to_end(key)
+            return cached[1]
+    
+    persona = PERSONA_GENERATOR.generate_persona(user_data)
+    
+    with _persona_cache_lock:
+        _persona_cache[key] = (now, persona)
+        _persona_cache.move_to_end(key)
+        if len(_persona_cache) > PERSONA_CACHE_SIZE:
+            _persona_cache.popitem(last=False)
+    
+    return persona
+
+def load_cached_user_data(username):
+    """Return previously scraped data for username if it is younger than CACHE_TTL"""
+    data_filename = os.path.join(OUTPUT_DIR, f"{username}_raw_data.json")
+    try:
+        if time.time() - os.path.getmtime(data_filename) > CACHE_TTL:
+            return None
+        with open(data_filename, 'rb') as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+def save_user_data(username, user_data):
+    """Atomically write scraped data for username to the output directory"""
+    data_filename = os.path.join(OUTPUT_DIR, f"{username}_raw_data.json")
+    # Unique per writer; opened with plain open() so the file gets the usual umask mode
+    tmp_filename = f"{data_filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_filename, 'xb') as f:
+            f.write(orjson.dumps(user_data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_filename, data_filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_filename)
+        except OSError:
+            pass
+        raise
+    return data_filename
+
 @app.route('/')
 def index():
     """Render the main page"""
@@ -35,45 +129,37 @@ def generate_persona():
         
         profile_url = data['url'].strip()
         
-        # Validate URL format
-        if not profile_url.startswith("https://www.reddit.com/user/"):
+        # Validate URL format and extract username
+        match = USER_URL_RE.match(profile_url)
+        if not match:
             return jsonify({'error': 'Please provide a valid Reddit user profile URL. Format: https://www.reddit.com/user/username/'}), 400
         
-        # Extract username from URL
-        username = profile_url.split("/user/")[1].rstrip("/")
-        
-        logger.info(f"Generating persona for user: {username}")
-        
-        # Initialize scraper and generator
-        scraper = RedditScraper()
-        persona_generator = PersonaGenerator()
+        username = match.group(1)
         
-        # Scrape user data
-        logger.info("Scraping Reddit data...")
-        user_data = scraper.scrape_user_profile(username)
+        logger.info("Generating persona for user: %s", username)
         
-        if not user_data:
-            return jsonify({'error': 'Failed to scrape user data. User might not exist or profile is private.'}), 404
+        # Reuse recently scraped data, otherwise scrape and save it
+        user_data = load_cached_user_data(username)
+        if user_data is not None:
+            logger.info("Using cached Reddit data...")
+        else:
+            logger.info("Scraping Reddit data...")
+            user_data = SCRAPER.scrape_user_profile(username)
+            
+            if not user_data:
+                return jsonify({'error': 'Failed to scrape user data. User might not exist or profile is private.'}), 404
+            
+            save_user_data(username, user_data)
         
         # Generate persona
         logger.info("Generating user persona...")
-        persona = persona_generator.generate_persona(user_data)
-        
-        # Create sample_outputs directory if it doesn't exist
-        output_dir = "sample_outputs"
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        persona = get_persona(user_data)
         
         # Save to file
-        output_filename = os.path.join(output_dir, f"{username}_persona.txt")
+        output_filename = os.path.join(OUTPUT_DIR, f"{username}_persona.txt")
         with open(output_filename, 'w', encoding='utf-8') as f:
             f.write(persona)
         
-        # Save raw data
-        data_filename = os.path.join(output_dir, f"{username}_raw_data.json")
-        with open(data_filename, 'w', encoding='utf-8') as f:
-            json.dump(user_data, f, indent=2, ensure_ascii=False)
-        
         return jsonify({
             'success': True,
             'username': username,
@@ -87,24 +173,33 @@ def generate_persona():
         })
         
     except Exception as e:
-        logger.error(f"Error generating persona: {str(e)}")
+        logger.error("Error generating persona: %s", e)
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 # FIXED: Added <username> parameter to the route
 @app.route('/download/<username>')
 def download_persona(username):
     """Download the generated persona file"""
+    # Same rule /generate applies, so every persona it writes can be downloaded
+    if not USERNAME_RE.fullmatch(username):
+        return jsonify({'error': 'Persona file not found'}), 404
+    
     try:
-        output_filename = f"sample_outputs/{username}_persona.txt"
-        if os.path.exists(output_filename):
-            return send_file(
-                output_filename,
-                as_attachment=True,
-                download_name=f"{username}_persona.txt",
-                mimetype='text/plain'
-            )
-        else:
-            return jsonify({'error': 'Persona file not found'}), 404
+        filename = f"{username}_persona.txt"
+        # Resolve against the working directory, where /generate writes its files
+        # conditional=True answers If-None-Match / If-Modified-Since with 304; max_age=0
+        # makes clients revalidate every time, since /generate rewrites the file in place
+        return send_from_directory(
+            os.path.abspath(OUTPUT_DIR),
+            filename,
+            as_attachment=True,
+            download_name=filename,
+            mimetype='text/plain',
+            conditional=True,
+            max_age=0
+        )
+    except NotFound:
+        return jsonify({'error': 'Persona file not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -122,4 +217,4 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
\ No newline at end of file
@@ -6,6 +6,12 @@ Configuration settings for Reddit Persona Generator
 REDDIT_BASE_URL = "https://www.reddit.com"
 REQUEST_TIMEOUT = 30
 RATE_LIMIT_DELAY = 1  # seconds between requests
+RATE_LIMIT_BURST = 5  # requests allowed back to back before spacing kicks in
+MAX_RETRIES = 3  # retries after an HTTP 429
+RETRY_BACKOFF_BASE = 2  # seconds; doubled on each retry without Retry-After
+MAX_RETRY_DELAY = 60  # seconds
+HTTP_CACHE_SIZE = 256  # responses kept for ETag / Last-Modified revalidation
+MAX_CONCURRENT_REQUESTS = 4  # simultaneous requests to Reddit
 
 # User agent for requests
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -14,9 +20,14 @@ USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTM
 MAX_PAGES = 3
 ITEMS_PER_PAGE = 100
 
+# Output settings
+OUTPUT_DIR = "sample_outputs"
+CACHE_TTL = 3600  # seconds before a user's saved raw data is scraped again
+
 # Persona generation settings
 MAX_INTERESTS = 5
 MAX_PERSONALITY_TRAITS = 3
 MAX_GOALS = 5
 MAX_FRUSTRATIONS = 5
-MAX_CITATIONS_PER_ITEM = 3
\ No newline at end of file
+MAX_CITATIONS_PER_ITEM = 3
+PERSONA_CACHE_SIZE = 256  # generated personas kept in memory
\ No newline at end of file
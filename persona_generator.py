@@ -4,40 +4,95 @@ Generates user personas from Reddit data using text analysis
 """
 
 import re
-import json
+import ahocorasick
 from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import chain
+from operator import itemgetter
 from datetime import datetime
-from typing import Dict, List, Set, Tuple
-import statistics
+from typing import Dict, List, Optional, Tuple
+
+@dataclass
+class Citation:
+    """A post or comment that persona findings can cite"""
+    # Declared by hand: dataclass(slots=True) needs Python 3.10
+    __slots__ = ('type', 'text', 'text_lower', 'subreddit', 'permalink', 'score')
+    
+    type: str
+    text: str
+    text_lower: str
+    subreddit: Optional[str]
+    permalink: Optional[str]
+    score: int
+
+# Keyword vocabulary, shared by every PersonaGenerator
+INTERESTS_KEYWORDS = {
+    'technology': ('tech', 'programming', 'code', 'software', 'developer', 'computer', 'AI', 'machine learning'),
+    'gaming': ('game', 'gaming', 'xbox', 'playstation', 'nintendo', 'steam', 'esports'),
+    'fitness': ('gym', 'workout', 'exercise', 'fitness', 'health', 'running', 'lifting'),
+    'food': ('cooking', 'recipe', 'food', 'restaurant', 'meal', 'diet', 'nutrition'),
+    'travel': ('travel', 'trip', 'vacation', 'country', 'city', 'flight', 'hotel'),
+    'music': ('music', 'song', 'album', 'artist', 'concert', 'band', 'listen'),
+    'movies': ('movie', 'film', 'cinema', 'actor', 'director', 'netflix', 'series'),
+    'books': ('book', 'read', 'author', 'novel', 'literature', 'story', 'chapter'),
+    'sports': ('sport', 'football', 'basketball', 'soccer', 'baseball', 'hockey', 'tennis'),
+    'politics': ('politics', 'political', 'government', 'election', 'vote', 'policy', 'democracy')
+}
+
+SENTIMENT_POSITIVE = ('good', 'great', 'awesome', 'amazing', 'love', 'like', 'best', 'excellent', 'fantastic')
+SENTIMENT_NEGATIVE = ('bad', 'terrible', 'awful', 'hate', 'dislike', 'worst', 'horrible', 'sucks')
+
+PERSONALITY_INDICATORS = {
+    'extrovert': ('social', 'party', 'meeting', 'friends', 'crowd', 'public', 'group'),
+    'introvert': ('alone', 'quiet', 'home', 'solitude', 'private', 'solo', 'myself'),
+    'analytical': ('analyze', 'data', 'logic', 'reason', 'think', 'research', 'study'),
+    'creative': ('creative', 'art', 'design', 'music', 'write', 'create', 'imagine'),
+    'practical': ('practical', 'useful', 'efficient', 'work', 'solution', 'fix', 'build')
+}
+
+GOAL_KEYWORDS = ('want', 'need', 'goal', 'hope', 'wish', 'trying', 'learning', 'improve')
+FRUSTRATION_KEYWORDS = ('frustrated', 'annoying', 'hate', 'problem', 'issue', 'difficult', 'hard', 'struggle')
+
+KEYWORD_GROUPS = {
+    'interests': INTERESTS_KEYWORDS,
+    'personality': PERSONALITY_INDICATORS,
+    'goals': {'goals': GOAL_KEYWORDS},
+    'frustrations': {'frustrations': FRUSTRATION_KEYWORDS}
+}
+
+def _build_automaton(keyword_groups: Dict[str, Dict[str, Tuple[str, ...]]]) -> ahocorasick.Automaton:
+    """
+    Build an Aho-Corasick automaton over every keyword in every group
+    
+    Each keyword maps to (keyword, ((group, category), ...)) since a keyword
+    such as 'music' can belong to more than one group.
+    """
+    keyword_categories = defaultdict(list)
+    for group, categories in keyword_groups.items():
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                keyword_categories[keyword].append((group, category))
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, group_categories in keyword_categories.items():
+        automaton.add_word(keyword, (keyword, tuple(group_categories)))
+    automaton.make_automaton()
+    return automaton
+
+def _build_sentence_pattern(keywords: Tuple[str, ...]) -> re.Pattern:
+    """Compile a pattern matching each '.'-delimited sentence that contains a keyword"""
+    alternatives = '|'.join(map(re.escape, keywords))
+    # Anchor at a sentence start so non-matching sentences fail fast
+    return re.compile(r'(?:^|(?<=\.))[^.]*?(?:' + alternatives + r')[^.]*')
+
+# Built once at import: all keyword groups share one automaton, so each citation is scanned once
+_KEYWORD_AUTOMATON = _build_automaton(KEYWORD_GROUPS)
+_GOAL_PATTERN = _build_sentence_pattern(GOAL_KEYWORDS)
+_FRUSTRATION_PATTERN = _build_sentence_pattern(FRUSTRATION_KEYWORDS)
 
 class PersonaGenerator:
     """Generates user personas from Reddit data"""
     
-    def __init__(self):
-        self.interests_keywords = {
-            'technology': ['tech', 'programming', 'code', 'software', 'developer', 'computer', 'AI', 'machine learning'],
-            'gaming': ['game', 'gaming', 'xbox', 'playstation', 'nintendo', 'steam', 'esports'],
-            'fitness': ['gym', 'workout', 'exercise', 'fitness', 'health', 'running', 'lifting'],
-            'food': ['cooking', 'recipe', 'food', 'restaurant', 'meal', 'diet', 'nutrition'],
-            'travel': ['travel', 'trip', 'vacation', 'country', 'city', 'flight', 'hotel'],
-            'music': ['music', 'song', 'album', 'artist', 'concert', 'band', 'listen'],
-            'movies': ['movie', 'film', 'cinema', 'actor', 'director', 'netflix', 'series'],
-            'books': ['book', 'read', 'author', 'novel', 'literature', 'story', 'chapter'],
-            'sports': ['sport', 'football', 'basketball', 'soccer', 'baseball', 'hockey', 'tennis'],
-            'politics': ['politics', 'political', 'government', 'election', 'vote', 'policy', 'democracy']
-        }
-        
-        self.sentiment_positive = ['good', 'great', 'awesome', 'amazing', 'love', 'like', 'best', 'excellent', 'fantastic']
-        self.sentiment_negative = ['bad', 'terrible', 'awful', 'hate', 'dislike', 'worst', 'horrible', 'sucks']
-        
-        self.personality_indicators = {
-            'extrovert': ['social', 'party', 'meeting', 'friends', 'crowd', 'public', 'group'],
-            'introvert': ['alone', 'quiet', 'home', 'solitude', 'private', 'solo', 'myself'],
-            'analytical': ['analyze', 'data', 'logic', 'reason', 'think', 'research', 'study'],
-            'creative': ['creative', 'art', 'design', 'music', 'write', 'create', 'imagine'],
-            'practical': ['practical', 'useful', 'efficient', 'work', 'solution', 'fix', 'build']
-        }
-    
     def generate_persona(self, user_data: Dict) -> str:
         """
         Generate a comprehensive user persona
@@ -53,39 +108,29 @@ class PersonaGenerator:
         comments = user_data['comments']
         user_info = user_data.get('user_info', {})
         
-        # Combine all text content
-        all_text = []
-        citations = []
-        
-        for post in posts:
-            text = f"{post.get('title', '')} {post.get('selftext', '')}"
-            all_text.append(text.lower())
-            citations.append({
-                'type': 'post',
-                'text': text,
-                'subreddit': post.get('subreddit'),
-                'permalink': post.get('permalink'),
-                'score': post.get('score', 0)
-            })
-        
-        for comment in comments:
-            text = comment.get('body', '')
-            all_text.append(text.lower())
-            citations.append({
-                'type': 'comment',
-                'text': text,
-                'subreddit': comment.get('subreddit'),
-                'permalink': comment.get('permalink'),
-                'score': comment.get('score', 0)
-            })
+        # Build citations for all text content
+        citations = [
+            self._make_citation('post', f"{post.get('title', '')} {post.get('selftext', '')}", post)
+            for post in posts
+        ]
+        citations += [
+            self._make_citation('comment', comment.get('body', ''), comment)
+            for comment in comments
+        ]
+        
+        # Count subreddit activity once for basic info and behavior
+        subreddit_counts = Counter(
+            item['subreddit'] for item in chain(posts, comments) if item.get('subreddit')
+        )
         
         # Generate persona components
-        basic_info = self._generate_basic_info(username, user_info, posts, comments)
-        interests = self._analyze_interests(all_text, citations)
-        personality = self._analyze_personality(all_text, citations)
-        behavior = self._analyze_behavior(posts, comments, citations)
-        goals = self._analyze_goals(all_text, citations)
-        frustrations = self._analyze_frustrations(all_text, citations)
+        basic_info = self._generate_basic_info(username, user_info, posts, comments, subreddit_counts)
+        scores, matches = self._keyword_scan(citations)
+        interests = self._analyze_interests(scores['interests'], matches['interests'])
+        personality = self._analyze_personality(scores['personality'], matches['personality'])
+        behavior = self._analyze_behavior(posts, comments, citations, subreddit_counts)
+        goals = self._analyze_goals(matches['goals']['goals'])
+        frustrations = self._analyze_frustrations(matches['frustrations']['frustrations'])
         
         # Format persona
         persona = self._format_persona(
@@ -94,7 +139,42 @@ class PersonaGenerator:
         
         return persona
     
-    def _generate_basic_info(self, username: str, user_info: Dict, posts: List, comments: List) -> Dict:
+    def _keyword_scan(self, citations: List[Citation]) -> Tuple[Dict[str, Dict[str, int]], Dict[str, Dict[str, List[Citation]]]]:
+        """
+        Scan every citation once for all keyword groups
+        
+        Args:
+            citations: List of citations to scan
+            
+        Returns:
+            Tuple of (keyword hit counts, matching citations), both keyed by
+            group and then category
+        """
+        scores = {group: dict.fromkeys(categories, 0) for group, categories in KEYWORD_GROUPS.items()}
+        matches = {group: defaultdict(list) for group in KEYWORD_GROUPS}
+        
+        for citation in citations:
+            # Tally keyword hits for this citation in C
+            hits = Counter(map(itemgetter(1), _KEYWORD_AUTOMATON.iter(citation.text_lower)))
+            cited = set()
+            for (keyword, group_categories), count in hits.items():
+                for group, category in group_categories:
+                    scores[group][category] += count
+                    
+                    # Cite once per category
+                    if (group, category) not in cited:
+                        cited.add((group, category))
+                        matches[group][category].append(citation)
+        
+        return scores, matches
+    
+    def _make_citation(self, kind: str, text: str, item: Dict) -> Citation:
+        """Build a citation for a post or comment"""
+        get = item.get
+        return Citation(kind, text, text.lower(), get('subreddit'), get('permalink'), get('score', 0))
+    
+    def _generate_basic_info(self, username: str, user_info: Dict, posts: List, comments: List,
+                             subreddit_counts: Counter) -> Dict:
         """Generate basic user information"""
         account_age = "Unknown"
         if user_info.get('created_utc'):
@@ -106,15 +186,7 @@ class PersonaGenerator:
         link_karma = user_info.get('link_karma', 0)
         
         # Most active subreddits
-        subreddits = []
-        for post in posts:
-            if post.get('subreddit'):
-                subreddits.append(post['subreddit'])
-        for comment in comments:
-            if comment.get('subreddit'):
-                subreddits.append(comment['subreddit'])
-        
-        top_subreddits = Counter(subreddits).most_common(5)
+        top_subreddits = subreddit_counts.most_common(5)
         
         return {
             'username': username,
@@ -127,23 +199,8 @@ class PersonaGenerator:
             'top_subreddits': top_subreddits
         }
     
-    def _analyze_interests(self, all_text: List[str], citations: List[Dict]) -> Dict:
-        """Analyze user interests based on text content"""
-        interest_scores = defaultdict(int)
-        interest_citations = defaultdict(list)
-        
-        combined_text = ' '.join(all_text)
-        
-        for interest, keywords in self.interests_keywords.items():
-            for keyword in keywords:
-                count = combined_text.count(keyword)
-                interest_scores[interest] += count
-                
-                # Find citations for this interest
-                for i, citation in enumerate(citations):
-                    if keyword in citation['text'].lower():
-                        interest_citations[interest].append(citation)
-        
+    def _analyze_interests(self, interest_scores: Dict[str, int], interest_citations: Dict[str, List[Citation]]) -> Dict:
+        """Analyze user interests from keyword scan results"""
         # Get top interests
         top_interests = sorted(interest_scores.items(), key=lambda x: x[1], reverse=True)[:5]
         
@@ -152,23 +209,9 @@ class PersonaGenerator:
             'citations': dict(interest_citations)
         }
     
-    def _analyze_personality(self, all_text: List[str], citations: List[Dict]) -> Dict:
-        """Analyze personality traits"""
-        personality_scores = defaultdict(int)
-        personality_citations = defaultdict(list)
-        
-        combined_text = ' '.join(all_text)
-        
-        for trait, keywords in self.personality_indicators.items():
-            for keyword in keywords:
-                count = combined_text.count(keyword)
-                personality_scores[trait] += count
-                
-                # Find citations
-                for citation in citations:
-                    if keyword in citation['text'].lower():
-                        personality_citations[trait].append(citation)
-        
+    def _analyze_personality(self, personality_scores: Dict[str, int],
+                             personality_citations: Dict[str, List[Citation]]) -> Dict:
+        """Analyze personality traits from keyword scan results"""
         # Determine dominant traits
         dominant_traits = sorted(personality_scores.items(), key=lambda x: x[1], reverse=True)[:3]
         
@@ -177,7 +220,8 @@ class PersonaGenerator:
             'citations': dict(personality_citations)
         }
     
-    def _analyze_behavior(self, posts: List, comments: List, citations: List[Dict]) -> Dict:
+    def _analyze_behavior(self, posts: List, comments: List, citations: List[Citation],
+                          subreddit_counts: Counter) -> Dict:
         """Analyze user behavior patterns"""
         behaviors = []
         behavior_citations = []
@@ -190,26 +234,18 @@ class PersonaGenerator:
         
         # Average scores
         if posts:
-            avg_post_score = statistics.mean([p.get('score', 0) for p in posts])
+            avg_post_score = sum(p.get('score', 0) for p in posts) / len(posts)
             if avg_post_score > 10:
                 behaviors.append("Creates engaging content with good community response")
         
         if comments:
-            avg_comment_score = statistics.mean([c.get('score', 0) for c in comments])
+            avg_comment_score = sum(c.get('score', 0) for c in comments) / len(comments)
             if avg_comment_score > 5:
                 behaviors.append("Provides valuable comments that receive positive feedback")
         
         # Most active subreddits
-        subreddits = []
-        for post in posts:
-            if post.get('subreddit'):
-                subreddits.append(post['subreddit'])
-        for comment in comments:
-            if comment.get('subreddit'):
-                subreddits.append(comment['subreddit'])
-        
-        if subreddits:
-            top_subreddit = Counter(subreddits).most_common(1)[0]
+        if subreddit_counts:
+            top_subreddit = subreddit_counts.most_common(1)[0]
             behaviors.append(f"Most active in r/{top_subreddit[0]} with {top_subreddit[1]} interactions")
         
         return {
@@ -217,58 +253,43 @@ class PersonaGenerator:
             'citations': behavior_citations
         }
     
-    def _analyze_goals(self, all_text: List[str], citations: List[Dict]) -> Dict:
-        """Analyze user goals and motivations"""
-        goal_keywords = ['want', 'need', 'goal', 'hope', 'wish', 'trying', 'learning', 'improve']
-        goals = []
-        goal_citations = []
-        
-        combined_text = ' '.join(all_text)
+    def _analyze_goals(self, citations: List[Citation]) -> Dict:
+        """Analyze user goals and motivations in citations containing a goal keyword"""
+        goals, goal_citations = self._find_sentences(_GOAL_PATTERN, citations)
         
-        for citation in citations:
-            text = citation['text'].lower()
-            for keyword in goal_keywords:
-                if keyword in text:
-                    # Extract sentence containing the goal
-                    sentences = text.split('.')
-                    for sentence in sentences:
-                        if keyword in sentence:
-                            goals.append(sentence.strip())
-                            goal_citations.append(citation)
-                            break
+        return {
+            'goals': goals,  # Top 5 goals
+            'citations': goal_citations
+        }
+    
+    def _analyze_frustrations(self, citations: List[Citation]) -> Dict:
+        """Analyze user frustrations in citations containing a frustration keyword"""
+        frustrations, frustration_citations = self._find_sentences(_FRUSTRATION_PATTERN, citations)
         
         return {
-            'goals': goals[:5],  # Top 5 goals
-            'citations': goal_citations[:5]
+            'frustrations': frustrations,  # Top 5 frustrations
+            'citations': frustration_citations
         }
     
-    def _analyze_frustrations(self, all_text: List[str], citations: List[Dict]) -> Dict:
-        """Analyze user frustrations"""
-        frustration_keywords = ['frustrated', 'annoying', 'hate', 'problem', 'issue', 'difficult', 'hard', 'struggle']
-        frustrations = []
-        frustration_citations = []
+    def _find_sentences(self, pattern: re.Pattern, citations: List[Citation], limit: int = 5) -> Tuple[List[str], List[Citation]]:
+        """Collect up to `limit` sentences matched by pattern, paired with their citations"""
+        sentences = []
+        sentence_citations = []
         
         for citation in citations:
-            text = citation['text'].lower()
-            for keyword in frustration_keywords:
-                if keyword in text:
-                    sentences = text.split('.')
-                    for sentence in sentences:
-                        if keyword in sentence:
-                            frustrations.append(sentence.strip())
-                            frustration_citations.append(citation)
-                            break
+            for match in pattern.finditer(citation.text_lower):
+                sentences.append(match.group(0).strip())
+                sentence_citations.append(citation)
+                if len(sentences) == limit:
+                    return sentences, sentence_citations
         
-        return {
-            'frustrations': frustrations[:5],  # Top 5 frustrations
-            'citations': frustration_citations[:5]
-        }
+        return sentences, sentence_citations
     
     def _format_persona(self, basic_info: Dict, interests: Dict, personality: Dict, 
                        behavior: Dict, goals: Dict, frustrations: Dict) -> str:
         """Format the persona into a readable text file"""
         
-        persona = f"""
+        parts = [f"""
 USER PERSONA: {basic_info['username']}
 {'=' * 60}
 
@@ -280,75 +301,79 @@ BASIC INFORMATION:
 • Comments Made: {basic_info['total_comments']}
 
 TOP SUBREDDITS:
-"""
+"""]
         
         for subreddit, count in basic_info['top_subreddits']:
-            persona += f"• r/{subreddit} ({count} interactions)\n"
+            parts.append(f"• r/{subreddit} ({count} interactions)\n")
         
-        persona += f"""
+        parts.append(f"""
 INTERESTS & HOBBIES:
-"""
+""")
         
         for interest, score in interests['top_interests']:
             if score > 0:
-                persona += f"• {interest.title()}: {score} mentions\n"
+                parts.append(f"• {interest.title()}: {score} mentions\n")
                 # Add citations
                 if interest in interests['citations']:
                     citations = interests['citations'][interest][:3]  # Top 3 citations
                     for citation in citations:
-                        persona += f"  - Citation: r/{citation.get('subreddit', 'unknown')} - {citation['text'][:100]}...\n"
-                        persona += f"    Link: {citation.get('permalink', 'N/A')}\n"
+                        parts.append(
+                            f"  - Citation: r/{citation.subreddit} - {citation.text[:100]}...\n"
+                            f"    Link: {citation.permalink}\n"
+                        )
         
-        persona += f"""
+        parts.append(f"""
 PERSONALITY TRAITS:
-"""
+""")
         
         for trait, score in personality['dominant_traits']:
             if score > 0:
-                persona += f"• {trait.title()}: {score} indicators\n"
+                parts.append(f"• {trait.title()}: {score} indicators\n")
                 # Add citations
                 if trait in personality['citations']:
                     citations = personality['citations'][trait][:2]  # Top 2 citations
                     for citation in citations:
-                        persona += f"  - Citation: r/{citation.get('subreddit', 'unknown')} - {citation['text'][:100]}...\n"
-                        persona += f"    Link: {citation.get('permalink', 'N/A')}\n"
+                        parts.append(
+                            f"  - Citation: r/{citation.subreddit} - {citation.text[:100]}...\n"
+                            f"    Link: {citation.permalink}\n"
+                        )
         
-        persona += f"""
+        parts.append(f"""
 BEHAVIOR PATTERNS:
-"""
+""")
         
         for behavior_item in behavior['behaviors']:
-            persona += f"• {behavior_item}\n"
+            parts.append(f"• {behavior_item}\n")
         
-        persona += f"""
+        parts.append(f"""
 GOALS & MOTIVATIONS:
-"""
+""")
         
         for goal in goals['goals']:
             if goal:
-                persona += f"• {goal}\n"
+                parts.append(f"• {goal}\n")
         
         if goals['citations']:
-            persona += "Citations:\n"
+            parts.append("Citations:\n")
             for citation in goals['citations']:
-                persona += f"  - r/{citation.get('subreddit', 'unknown')}: {citation.get('permalink', 'N/A')}\n"
+                parts.append(f"  - r/{citation.subreddit}: {citation.permalink}\n")
         
-        persona += f"""
+        parts.append(f"""
 FRUSTRATIONS & PAIN POINTS:
-"""
+""")
         
         for frustration in frustrations['frustrations']:
             if frustration:
-                persona += f"• {frustration}\n"
+                parts.append(f"• {frustration}\n")
         
         if frustrations['citations']:
-            persona += "Citations:\n"
+            parts.append("Citations:\n")
             for citation in frustrations['citations']:
-                persona += f"  - r/{citation.get('subreddit', 'unknown')}: {citation.get('permalink', 'N/A')}\n"
+                parts.append(f"  - r/{citation.subreddit}: {citation.permalink}\n")
         
-        persona += f"""
+        parts.append(f"""
 {'=' * 60}
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
+""")
         
-        return persona
\ No newline at end of file
+        return ''.join(parts)
\ No newline at end of file
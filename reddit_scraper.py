@@ -4,10 +4,90 @@ Uses Reddit's free JSON API to scrape user data
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import ijson
+import orjson
 import time
-import json
-from datetime import datetime
-from typing import Dict, List, Optional
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from datetime import datetime, timezone
+from functools import partial
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from config import (
+    MAX_CONCURRENT_REQUESTS, USER_AGENT, RATE_LIMIT_DELAY, RATE_LIMIT_BURST,
+    MAX_RETRIES, RETRY_BACKOFF_BASE, MAX_RETRY_DELAY, HTTP_CACHE_SIZE
+)
+
+# Fields kept from each listing item; everything else is dropped while parsing
+LISTING_FIELDS = {
+    't3': ('id', 'title', 'selftext', 'subreddit', 'score', 'created_utc', 'url', 'permalink'),
+    't1': ('id', 'body', 'subreddit', 'score', 'created_utc', 'permalink'),
+}
+
+# ijson prefixes of the kept fields, mapped to the field name
+_FIELD_PREFIXES = {
+    f'data.children.item.data.{field}': field
+    for fields in LISTING_FIELDS.values() for field in fields
+}
+_SCALAR_EVENTS = frozenset(('string', 'number', 'boolean', 'null'))
+
+# Listing permalinks are site-relative
+_PERMALINK_PREFIX = 'https://www.reddit.com'
+
+# Unwraps the 'data' member of a Reddit API response
+_get_data = itemgetter('data')
+
+def _pack_post(data: Dict) -> Dict:
+    """Convert a t3 listing item's fields into a post dict"""
+    return {
+        'id': data['id'],
+        'title': data.get('title', ''),
+        'selftext': data.get('selftext', ''),
+        'subreddit': data.get('subreddit'),
+        'score': data.get('score', 0),
+        'created_utc': data.get('created_utc'),
+        'url': data.get('url', ''),
+        'permalink': _PERMALINK_PREFIX + (data.get('permalink') or '')
+    }
+
+def _pack_comment(data: Dict) -> Dict:
+    """Convert a t1 listing item's fields into a comment dict"""
+    return {
+        'id': data['id'],
+        'body': data.get('body', ''),
+        'subreddit': data.get('subreddit'),
+        'score': data.get('score', 0),
+        'created_utc': data.get('created_utc'),
+        'permalink': _PERMALINK_PREFIX + (data.get('permalink') or '')
+    }
+
+class TokenBucket:
+    """Thread-safe token bucket that spaces out requests once a burst is used up"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
 
 class RedditScraper:
     """Scrapes Reddit user profiles using the free Reddit JSON API"""
@@ -15,237 +95,310 @@ class RedditScraper:
     def __init__(self):
         self.base_url = "https://www.reddit.com"
         self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            'User-Agent': USER_AGENT
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        # Keep enough pooled keep-alive connections for every concurrent request
+        self.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENT_REQUESTS))
+        # Bounds in-flight requests to Reddit across threads
+        self._request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+        self._rate_limiter = TokenBucket(rate=1 / RATE_LIMIT_DELAY, capacity=RATE_LIMIT_BURST)
+        # url -> (ETag, Last-Modified, parsed result) for conditional requests
+        self._http_cache = OrderedDict()
+        self._http_cache_lock = threading.Lock()
+        # Runs the about.json request alongside the listing request(s) on the caller's thread
+        self._info_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+    
+    def _get(self, url: str, stream: bool = False, headers: Optional[Dict] = None) -> requests.Response:
+        """Issue a rate-limited GET request through the shared session, retrying on HTTP 429"""
+        for attempt in range(MAX_RETRIES + 1):
+            self._rate_limiter.acquire()
+            response = self.session.get(url, timeout=30, stream=stream, headers=headers)
+            
+            if response.status_code != 429 or attempt == MAX_RETRIES:
+                return response
+            
+            response.close()
+            delay = self._retry_delay(response, attempt)
+            print(f"Rate limited, waiting {delay:.1f} seconds...")
+            time.sleep(delay)
+    
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float:
+        """Seconds to wait after a 429: Retry-After if given, else exponential backoff with jitter"""
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(MAX_RETRY_DELAY, int(retry_after))
+        return min(MAX_RETRY_DELAY, RETRY_BACKOFF_BASE * 2 ** attempt) + random.uniform(0, 1)
+    
+    def _fetch(self, url: str, parse: Callable[[requests.Response], Any]) -> Any:
+        """
+        GET url and parse the response, revalidating earlier results with the server
+        
+        Args:
+            url: URL to fetch
+            parse: Turns a successful streamed response into the value to return
+            
+        Returns:
+            The parsed value, or a copy of the cached one when the server answers 304
+        """
+        with self._http_cache_lock:
+            cached = self._http_cache.get(url)
+        
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        
+        # Hold a slot until the streamed body is consumed and its connection is back in the pool
+        with self._request_slots, self._get(url, stream=True, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                # Re-insert rather than touch: another thread may have evicted url meanwhile
+                self._remember(url, cached)
+                # Callers own what they get back, so never hand out the cached objects
+                return deepcopy(cached[2])
+            
+            response.raise_for_status()
+            result = parse(response)
+        
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self._remember(url, (etag, last_modified, deepcopy(result)))
+        
+        return result
     
-    def scrape_user_profile(self, username: str) -> Optional[Dict]:
+    def _remember(self, url: str, entry: Tuple) -> None:
+        """Store or refresh a conditional-request cache entry, evicting the least recently used"""
+        with self._http_cache_lock:
+            self._http_cache[url] = entry
+            self._http_cache.move_to_end(url)
+            if len(self._http_cache) > HTTP_CACHE_SIZE:
+                self._http_cache.popitem(last=False)
+    
+    def _read_listing(self, response: requests.Response) -> Tuple[List[Dict], List[Dict], Optional[str]]:
+        """
+        Stream-parse a listing response into posts and comments as it downloads
+        
+        Args:
+            response: Response opened with stream=True
+            
+        Returns:
+            Tuple of (posts, comments, after token)
+        """
+        posts = []
+        comments = []
+        append_post = posts.append
+        append_comment = comments.append
+        after = None
+        kind = None
+        item_data = None
+        
+        # Let urllib3 undo any gzip/deflate content-encoding as the body streams in
+        response.raw.decode_content = True
+        
+        # Only the kept scalar fields are turned into Python objects; all other
+        # parser events are skipped without building values
+        for prefix, event, value in ijson.parse(response.raw, use_float=True):
+            field = _FIELD_PREFIXES.get(prefix)
+            if field is not None:
+                if event in _SCALAR_EVENTS:
+                    item_data[field] = value
+            elif prefix == 'data.children.item':
+                if event == 'start_map':
+                    kind = None
+                    item_data = {}
+                elif event == 'end_map':
+                    if kind == 't3':  # Post
+                        append_post(_pack_post(item_data))
+                    elif kind == 't1':  # Comment
+                        append_comment(_pack_comment(item_data))
+            elif prefix == 'data.children.item.kind':
+                kind = value
+            elif prefix == 'data.after':
+                after = value
+        
+        return posts, comments, after
+    
+    def scrape_user_profile(self, username: str, scraped_at: Optional[str] = None) -> Optional[Dict]:
         """
         Scrape a Reddit user's profile data
         
         Args:
             username: Reddit username
+            scraped_at: ISO timestamp to record; defaults to the current UTC time
             
         Returns:
             Dict containing user data with posts and comments
         """
         try:
-            # Get user overview (posts and comments)
+            # Fetch user info in the background while this thread fetches the overview
+            info_future = self._info_executor.submit(self._get_user_info, username)
             overview_data = self._get_user_overview(username)
+            user_info = info_future.result()
             
             if not overview_data:
                 return None
             
-            # Get user info
-            user_info = self._get_user_info(username)
-            
-            # Parse and organize data
-            posts = []
-            comments = []
-            
-            for item in overview_data:
-                if item.get('kind') == 't3':  # Post
-                    post_data = item['data']
-                    posts.append({
-                        'id': post_data.get('id'),
-                        'title': post_data.get('title', ''),
-                        'selftext': post_data.get('selftext', ''),
-                        'subreddit': post_data.get('subreddit'),
-                        'score': post_data.get('score', 0),
-                        'created_utc': post_data.get('created_utc'),
-                        'url': post_data.get('url', ''),
-                        'permalink': f"https://www.reddit.com{post_data.get('permalink', '')}"
-                    })
-                
-                elif item.get('kind') == 't1':  # Comment
-                    comment_data = item['data']
-                    comments.append({
-                        'id': comment_data.get('id'),
-                        'body': comment_data.get('body', ''),
-                        'subreddit': comment_data.get('subreddit'),
-                        'score': comment_data.get('score', 0),
-                        'created_utc': comment_data.get('created_utc'),
-                        'permalink': f"https://www.reddit.com{comment_data.get('permalink', '')}"
-                    })
+            posts, comments = overview_data
             
             return {
                 'username': username,
                 'user_info': user_info,
                 'posts': posts,
                 'comments': comments,
-                'scraped_at': datetime.now().isoformat()
+                'scraped_at': scraped_at or datetime.now(timezone.utc).isoformat()
             }
             
         except Exception as e:
             print(f"Error scraping user {username}: {str(e)}")
             return None
     
-# In reddit_scraper.py, update the _get_user_overview method:
-    def _get_user_overview(self, username: str) -> Optional[List]:
-        """Get user's overview data (posts and comments)"""
-        url = f"{self.base_url}/user/{username}.json"
+    def scrape_users(self, usernames: List[str], max_workers: int = 8) -> List[Optional[Dict]]:
+        """
+        Scrape several Reddit users' profiles in parallel
         
-        try:
-            # Add delay to be respectful
-            time.sleep(1)
+        Args:
+            usernames: Reddit usernames
+            max_workers: Number of profiles scraped at once
             
-            response = self.session.get(url, timeout=30)
+        Returns:
+            List of scrape_user_profile results, in the same order as usernames
+        """
+        # One timestamp for the whole batch
+        scrape = partial(self.scrape_user_profile, scraped_at=datetime.now(timezone.utc).isoformat())
+        
+        # Workers share the session's connection pool; _get still bounds and paces requests
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(scrape, usernames))
+    
+    def _iter_user_items(self, username: str, max_pages: int = 3, limit: int = 100) -> Iterator[Tuple[str, Dict]]:
+        """
+        Page through the user's overview listing, following 'after' tokens
+        
+        Args:
+            username: Reddit username
+            max_pages: Maximum number of pages to request
+            limit: Number of items to fetch per page
             
-            if response.status_code == 429:
-                print("Rate limited, waiting 10 seconds...")
-                time.sleep(10)
-                response = self.session.get(url, timeout=30)
-                
-            response.raise_for_status()
+        Yields:
+            ('t3', post) and ('t1', comment) tuples; pages are only requested as they are consumed
+        """
+        after = None
+        
+        for _ in range(max_pages):
+            url = f"{self.base_url}/user/{username}.json?raw_json=1&limit={limit}&sr_detail=false"
+            if after:
+                url += f"&after={after}"
             
-            data = response.json()
+            posts, comments, after = self._fetch(url, self._read_listing)
             
-            if 'data' in data and 'children' in data['data']:
-                return data['data']['children']
+            for post in posts:
+                yield 't3', post
+            for comment in comments:
+                yield 't1', comment
             
-            return None
+            # Stop on an empty page or when there is no next page token
+            if not after or not (posts or comments):
+                break
+    
+    def _get_user_overview(self, username: str) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        """Get user's overview data as (posts, comments)"""
+        posts = []
+        comments = []
+        append_post = posts.append
+        append_comment = comments.append
+        
+        try:
+            for kind, item in self._iter_user_items(username, max_pages=1):
+                if kind == 't3':
+                    append_post(item)
+                else:
+                    append_comment(item)
             
         except requests.RequestException as e:
             print(f"Error fetching overview for {username}: {str(e)}")
             return None
-        except json.JSONDecodeError as e:
+        except ijson.JSONError as e:
             print(f"Error parsing JSON for {username}: {str(e)}")
             return None
         
+        if not posts and not comments:
+            return None
+        
+        return posts, comments
+        
     def _get_user_info(self, username: str) -> Dict:
         """Get user's basic info"""
         url = f"{self.base_url}/user/{username}/about.json"
         
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if 'data' in data:
-                user_data = data['data']
-                return {
-                    'created_utc': user_data.get('created_utc'),
-                    'comment_karma': user_data.get('comment_karma', 0),
-                    'link_karma': user_data.get('link_karma', 0),
-                    'total_karma': user_data.get('total_karma', 0),
-                    'is_verified': user_data.get('verified', False),
-                    'has_verified_email': user_data.get('has_verified_email', False)
-                }
-            
-            return {}
+            user_data = _get_data(self._fetch(url, lambda response: orjson.loads(response.content)))
             
         except requests.RequestException as e:
             print(f"Error fetching user info for {username}: {str(e)}")
             return {}
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"Error parsing user info JSON for {username}: {str(e)}")
             return {}
+        except (KeyError, TypeError):
+            return {}
+        
+        return {
+            'created_utc': user_data.get('created_utc'),
+            'comment_karma': user_data.get('comment_karma', 0),
+            'link_karma': user_data.get('link_karma', 0),
+            'total_karma': user_data.get('total_karma', 0),
+            'is_verified': user_data.get('verified', False),
+            'has_verified_email': user_data.get('has_verified_email', False)
+        }
     
-    def get_multiple_pages(self, username: str, limit: int = 100) -> Optional[Dict]:
+    def get_multiple_pages(self, username: str, limit: int = 100, max_items: Optional[int] = None,
+                           scraped_at: Optional[str] = None) -> Optional[Dict]:
         """
         Get multiple pages of user data for more comprehensive analysis
         
         Args:
             username: Reddit username
             limit: Number of items to fetch per page
+            max_items: Stop once this many posts and comments are collected
+            scraped_at: ISO timestamp to record; defaults to the current UTC time
             
         Returns:
             Dict containing comprehensive user data
         """
         all_posts = []
         all_comments = []
-        after = None
+        append_post = all_posts.append
+        append_comment = all_comments.append
         
-        # Get up to 3 pages of data
-        for page in range(3):
-            url = f"{self.base_url}/user/{username}.json?limit={limit}"
-            if after:
-                url += f"&after={after}"
-            
-            try:
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if 'data' in data and 'children' in data['data']:
-                    items = data['data']['children']
-                    
-                    if not items:
-                        break
-                    
-                    for item in items:
-                        if item.get('kind') == 't3':  # Post
-                            post_data = item['data']
-                            all_posts.append({
-                                'id': post_data.get('id'),
-                                'title': post_data.get('title', ''),
-                                'selftext': post_data.get('selftext', ''),
-                                'subreddit': post_data.get('subreddit'),
-                                'score': post_data.get('score', 0),
-                                'created_utc': post_data.get('created_utc'),
-                                'url': post_data.get('url', ''),
-                                'permalink': f"https://www.reddit.com{post_data.get('permalink', '')}"
-                            })
-                        
-                        elif item.get('kind') == 't1':  # Comment
-                            comment_data = item['data']
-                            all_comments.append({
-                                'id': comment_data.get('id'),
-                                'body': comment_data.get('body', ''),
-                                'subreddit': comment_data.get('subreddit'),
-                                'score': comment_data.get('score', 0),
-                                'created_utc': comment_data.get('created_utc'),
-                                'permalink': f"https://www.reddit.com{comment_data.get('permalink', '')}"
-                            })
-                    
-                    # Get next page token
-                    after = data['data'].get('after')
-                    if not after:
-                        break
-                    
-                    # Rate limiting
-                    time.sleep(1)
-                
-            except Exception as e:
-                print(f"Error fetching page {page + 1}: {str(e)}")
-                break
+        # Fetch user info in the background while paging through the listing
+        info_future = self._info_executor.submit(self._get_user_info, username)
         
-        user_info = self._get_user_info(username)
+        # Get up to 3 pages of data; later pages are skipped once max_items is reached
+        items = self._iter_user_items(username, max_pages=3, limit=limit)
+        if max_items is not None:
+            items = islice(items, max_items)
+        
+        try:
+            for kind, item in items:
+                if kind == 't3':
+                    append_post(item)
+                else:
+                    append_comment(item)
+        
+        except Exception as e:
+            print(f"Error fetching pages for {username}: {str(e)}")
+        
+        user_info = info_future.result()
         
         return {
             'username': username,
             'user_info': user_info,
             'posts': all_posts,
             'comments': all_comments,
-            'scraped_at': datetime.now().isoformat()
+            'scraped_at': scraped_at or datetime.now(timezone.utc).isoformat()
         }
-        
-    # Temporary debug version - add this to reddit_scraper.py
-def _get_user_overview(self, username: str) -> Optional[List]:
-    """Get user's overview data (posts and comments)"""
-    url = f"{self.base_url}/user/{username}.json"
-    
-    print(f"DEBUG: Fetching URL: {url}")
-    
-    try:
-        response = self.session.get(url, timeout=30)
-        print(f"DEBUG: Response status: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"DEBUG: Non-200 response: {response.text}")
-            return None
-            
-        data = response.json()
-        print(f"DEBUG: Got data with {len(data.get('data', {}).get('children', []))} items")
-        
-        if 'data' in data and 'children' in data['data']:
-            return data['data']['children']
-        
-        return None
-        
-    except Exception as e:
-        print(f"DEBUG: Exception: {str(e)}")
-        return None
\ No newline at end of file